@@ -5,10 +5,10 @@ import json
 import os
 from typing import Dict, List
 
-import orjson
 import redis
 
-from libs.consensus_dpo.provider import CompletionRequest, GenParams, NovitaClient
+from libs.consensus_dpo.ipc import push_reply, task_expired
+from libs.consensus_dpo.provider import CompletionRequest, GenParams, make_provider
 
 
 IN_Q = os.getenv("DEBATE_QUEUE_IN", "queue:debate:in")
@@ -24,16 +24,28 @@ DEBATE_TEMPLATE = (
 
 async def debate_loop() -> None:
     r = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
-    client = NovitaClient()
+    client = make_provider()
     try:
         while True:
             _, payload = r.blpop(IN_Q)
             task: Dict = json.loads(payload)
-            prompt = DEBATE_TEMPLATE.format(problem=task["problem"], peer=task["peer"])
-            params = GenParams(temperature=0.7, top_p=0.9, max_tokens=180)
+            if task_expired(task):
+                continue  # the orchestrator stopped waiting; don't pay for the call
+            # Dispatched tasks may carry a pre-rendered prompt and params
+            prompt = task.get("prompt") or DEBATE_TEMPLATE.format(problem=task["problem"], peer=task["peer"])
+            params = GenParams(
+                temperature=task.get("temperature", 0.7),
+                top_p=task.get("top_p", 0.9),
+                max_tokens=task.get("max_tokens", 180),
+                seed=task.get("seed"),
+            )
             req = CompletionRequest(model=task["model"], prompt=prompt, params=params)
-            out = await client.generate(req)
-            r.rpush(OUT_Q, orjson.dumps({"id": task.get("id"), "critique": out.text}))
+            try:
+                out = await client.generate(req)
+                result = {"id": task.get("id"), "critique": out.text}
+            except Exception as exc:  # report back so the orchestrator can return partial results
+                result = {"id": task.get("id"), "error": repr(exc)}
+            push_reply(r, task, result, OUT_Q)
     finally:
         await client.aclose()
 
@@ -1,27 +1,25 @@
 from __future__ import annotations
 
-import json
 import os
 from typing import Dict, List
 
-import numpy as np
+from libs.consensus_dpo.datasets.shards import iter_pairs
 
 
 def exact_match(pred: str, gold: str) -> float:
     return 1.0 if pred.strip() == gold.strip() else 0.0
 
 
-def evaluate_predictions(pairs_path: str) -> Dict[str, float]:
+def evaluate_predictions(pairs_path: str, split: str = "dev") -> Dict[str, float]:
+    """Score a pairs JSONL file, or the `split` shards of a shard manifest/directory."""
     ems: List[float] = []
-    with open(pairs_path, "r", encoding="utf-8") as f:
-        for line in f:
-            row = json.loads(line)
-            # If eval set encodes gold under tools or prompt, adapt accordingly
-            gold = row.get("gold", "")
-            pred = row.get("chosen", {}).get("answer", "")
-            if gold:
-                ems.append(exact_match(pred, gold))
-    return {"EM": float(np.mean(ems)) if ems else 0.0}
+    for row in iter_pairs(pairs_path, split=split):
+        # If eval set encodes gold under tools or prompt, adapt accordingly
+        gold = row.get("gold", "")
+        pred = row.get("chosen", {}).get("answer", "")
+        if gold:
+            ems.append(exact_match(pred, gold))
+    return {"EM": sum(ems) / len(ems) if ems else 0.0}
 
 
 if __name__ == "__main__":
@@ -5,10 +5,10 @@ import json
 import os
 from typing import Dict
 
-import orjson
 import redis
 
-from libs.consensus_dpo.provider import CompletionRequest, GenParams, NovitaClient
+from libs.consensus_dpo.ipc import push_reply, task_expired
+from libs.consensus_dpo.provider import CompletionRequest, GenParams, make_provider
 
 
 QUEUE_IN = os.getenv("GENERATOR_QUEUE_IN", "queue:generator:in")
@@ -17,11 +17,13 @@ QUEUE_OUT = os.getenv("GENERATOR_QUEUE_OUT", "queue:generator:out")
 
 async def worker_loop() -> None:
     r = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
-    client = NovitaClient()
+    client = make_provider()
     try:
         while True:
             _, payload = r.blpop(QUEUE_IN)
             task: Dict = json.loads(payload)
+            if task_expired(task):
+                continue  # the orchestrator stopped waiting; don't pay for the call
             params = GenParams(
                 temperature=task.get("temperature", 0.8),
                 top_p=task.get("top_p", 0.9),
@@ -29,8 +31,12 @@ async def worker_loop() -> None:
                 seed=task.get("seed"),
             )
             req = CompletionRequest(model=task["model"], prompt=task["prompt"], params=params)
-            out = await client.generate(req)
-            r.rpush(QUEUE_OUT, orjson.dumps({"id": task.get("id"), "text": out.text, "usage": out.usage}))
+            try:
+                out = await client.generate(req)
+                result = {"id": task.get("id"), "text": out.text, "usage": out.usage}
+            except Exception as exc:  # report back so the orchestrator can return partial results
+                result = {"id": task.get("id"), "error": repr(exc)}
+            push_reply(r, task, result, QUEUE_OUT)
     finally:
         await client.aclose()
 
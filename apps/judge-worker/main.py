@@ -5,10 +5,10 @@ import json
 import os
 from typing import Dict
 
-import orjson
 import redis
 
-from libs.consensus_dpo.provider import CompletionRequest, GenParams, NovitaClient
+from libs.consensus_dpo.ipc import push_reply, task_expired
+from libs.consensus_dpo.provider import CompletionRequest, GenParams, make_provider
 
 
 IN_Q = os.getenv("JUDGE_QUEUE_IN", "queue:judge:in")
@@ -17,23 +17,35 @@ OUT_Q = os.getenv("JUDGE_QUEUE_OUT", "queue:judge:out")
 JUDGE_TEMPLATE = (
     "You are a careful judge. Compare two answers (A,B) for the same task.\n"
     "Apply bias controls: ignore style; equalize length; consider evidence.\n"
-    "Return JSON: {winner:'A|B|Tie', reasons:['...','...'], score_delta:-3..3, pos_swap_consistency:true|false, len_norm_consistency:true|false}.\n"
+    "Return JSON: {{winner:'A|B|Tie', reasons:['...','...'], score_delta:-3..3, pos_swap_consistency:true|false, len_norm_consistency:true|false}}.\n"
     "Task: {problem}\nA: {a}\nB: {b}\n"
 )
 
 
 async def judge_loop() -> None:
     r = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
-    client = NovitaClient()
+    client = make_provider()
     try:
         while True:
             _, payload = r.blpop(IN_Q)
             task: Dict = json.loads(payload)
-            prompt = JUDGE_TEMPLATE.format(problem=task["problem"], a=task["a"], b=task["b"])
-            params = GenParams(temperature=0.2, top_p=0.9, max_tokens=200)
+            if task_expired(task):
+                continue  # the orchestrator stopped waiting; don't pay for the call
+            # Dispatched tasks may carry a pre-rendered prompt and params
+            prompt = task.get("prompt") or JUDGE_TEMPLATE.format(problem=task["problem"], a=task["a"], b=task["b"])
+            params = GenParams(
+                temperature=task.get("temperature", 0.2),
+                top_p=task.get("top_p", 0.9),
+                max_tokens=task.get("max_tokens", 200),
+                seed=task.get("seed"),
+            )
             req = CompletionRequest(model=task["model"], prompt=prompt, params=params)
-            out = await client.generate(req)
-            r.rpush(OUT_Q, orjson.dumps({"id": task.get("id"), "decision": out.text}))
+            try:
+                out = await client.generate(req)
+                result = {"id": task.get("id"), "decision": out.text}
+            except Exception as exc:  # report back so the orchestrator can return partial results
+                result = {"id": task.get("id"), "error": repr(exc)}
+            push_reply(r, task, result, OUT_Q)
     finally:
         await client.aclose()
 
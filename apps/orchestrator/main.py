@@ -1,17 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
-from typing import List, Optional
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional
 
 import orjson
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
-from libs.consensus_dpo.provider import CompletionRequest, GenParams, NovitaClient
+from libs.consensus_dpo.admission import AdmissionController, AdmissionRejected
+from libs.consensus_dpo.debate import DebateEngine
+from libs.consensus_dpo.provider import CompletionRequest, GenParams, ModelProvider, make_provider
 from libs.consensus_dpo.datasets import PairBuilder
 from libs.consensus_dpo.prompts import GENERATOR_TEMPLATE, JUDGE_TEMPLATE
 from libs.consensus_dpo.utils.json_utils import extract_json_object
 
+if TYPE_CHECKING:  # pragma: no cover
+    from libs.consensus_dpo.ipc import RedisDispatcher
+
 
 class GenerateRequest(BaseModel):
     prompt: str
@@ -27,17 +35,43 @@ class GenerateResponse(BaseModel):
     usage: Optional[dict] = None
 
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Consensus-DPO Orchestrator")
 
+admission = AdmissionController(
+    max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", 16)),
+    # Queue bounds are in provider calls (job cost), not jobs
+    max_queued=float(os.getenv("ADMISSION_MAX_QUEUED", 1024)),
+    max_queued_per_tenant=float(os.getenv("ADMISSION_MAX_QUEUED_PER_TENANT", 256)),
+    max_wait_s=float(os.getenv("ADMISSION_MAX_WAIT_S", 30)),
+)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _priority(requested: Optional[str], default: str) -> str:
+    return requested if requested in admission.class_weights else default
+
 
 @app.get("/health")
 async def health() -> dict:
-    return {"status": "ok"}
+    return {"status": "ok", "admission": admission.stats()}
 
 
 @app.post("/generate", response_model=GenerateResponse)
-async def generate(req: GenerateRequest) -> GenerateResponse:
-    client = NovitaClient()
+async def generate(
+    req: GenerateRequest,
+    x_tenant: str = Header("default"),
+    x_priority: Optional[str] = Header(None),
+) -> GenerateResponse:
     params = GenParams(
         temperature=req.temperature,
         top_p=req.top_p,
@@ -47,8 +81,13 @@ async def generate(req: GenerateRequest) -> GenerateResponse:
         CompletionRequest(model=req.model, prompt=req.prompt, params=params)
         for _ in range(req.k)
     ]
-    outs = await client.batchGenerate(tasks)
-    await client.aclose()
+    priority = _priority(x_priority, "interactive")
+    async with admission.slot(x_tenant, req.model, priority, cost=req.k):
+        client = make_provider()
+        try:
+            outs = await client.batchGenerate(tasks)
+        finally:
+            await client.aclose()
     return GenerateResponse(candidates=[o.text for o in outs], usage=outs[0].usage if outs else {})
 
 
@@ -57,12 +96,64 @@ class ConsensusRequest(BaseModel):
     model: str
     k: int = 3
     m: int = 2  # counterfactual judge views
-    r: int = 1  # debate rounds (R=1 minimal now)
+    r: int = 1  # max debate rounds; agents drop out early once they stop changing
+    debate_token_budget: int = 400  # cap on peer context per debate prompt
+    # Fan stages out to the Redis workers instead of calling the provider in-process
+    distributed: bool = os.getenv("CONSENSUS_DISTRIBUTED", "0") == "1"
+    timeout_s: float = float(os.getenv("CONSENSUS_STAGE_TIMEOUT_S", 120))  # per stage
 
 
-@app.post("/consensus")
-async def consensus(req: ConsensusRequest) -> dict:
-    client = NovitaClient()
+# Stage name -> (worker input queue, result field in the worker reply)
+STAGE_QUEUES = {
+    "generate": (os.getenv("GENERATOR_QUEUE_IN", "queue:generator:in"), "text"),
+    "debate": (os.getenv("DEBATE_QUEUE_IN", "queue:debate:in"), "critique"),
+    "judge": (os.getenv("JUDGE_QUEUE_IN", "queue:judge:in"), "decision"),
+}
+
+# Runs one stage's requests and returns texts in order; None marks a missing result
+StageRunner = Callable[[str, List[CompletionRequest]], Awaitable[List[Optional[str]]]]
+
+
+def _local_runner(client: ModelProvider) -> StageRunner:
+    async def run(stage: str, reqs: List[CompletionRequest]) -> List[Optional[str]]:
+        if stage == "generate":
+            return [o.text for o in await client.batchGenerate(reqs)]
+        # Debate and judge calls within a stage are independent; run them concurrently
+        outs = await asyncio.gather(*(client.generate(r) for r in reqs), return_exceptions=True)
+        texts: List[Optional[str]] = []
+        for o in outs:
+            if isinstance(o, BaseException):
+                # Surfaced as missing/failed counts in the response; keep the cause in logs
+                logger.warning("%s call failed: %r", stage, o)
+                texts.append(None)
+            else:
+                texts.append(o.text)
+        return texts
+
+    return run
+
+
+def _distributed_runner(dispatcher: RedisDispatcher, timeout_s: float) -> StageRunner:
+    async def run(stage: str, reqs: List[CompletionRequest]) -> List[Optional[str]]:
+        queue, field = STAGE_QUEUES[stage]
+        tasks = [
+            {
+                "model": r.model,
+                "prompt": r.prompt,
+                "temperature": r.params.temperature,
+                "top_p": r.params.top_p,
+                "max_tokens": r.params.max_tokens,
+                "seed": r.params.seed,
+            }
+            for r in reqs
+        ]
+        results = await dispatcher.run(queue, tasks, timeout_s)
+        return [res.get(field) if res and "error" not in res else None for res in results]
+
+    return run
+
+
+async def _run_consensus(req: ConsensusRequest, run_stage: StageRunner) -> dict:
     # 1) Generation with structured prompt
     gen_params = GenParams(temperature=0.9, top_p=0.95, max_tokens=512)
     prompts = [
@@ -70,23 +161,41 @@ async def consensus(req: ConsensusRequest) -> dict:
         for _ in range(req.k)
     ]
     gen_reqs = [CompletionRequest(model=req.model, prompt=p, params=gen_params) for p in prompts]
-    cands = await client.batchGenerate(gen_reqs)
+    gen_texts = await run_stage("generate", gen_reqs)
+    cands = [t for t in gen_texts if t is not None]
+    missing = {"generate": len(gen_texts) - len(cands)}
+    if not cands:
+        raise HTTPException(status_code=504, detail="no candidates returned before timeout")
 
-    # 2) Debate R=1 minimal (pairwise cross-exam skipped for brevity; next commit will add)
+    # 2) Debate: up to R rounds of cross-exam/defense among agents outside the majority
+    engine = DebateEngine(
+        lambda reqs: run_stage("debate", reqs),
+        model=req.model,
+        token_budget=req.debate_token_budget,
+    )
+    debate = await engine.run(req.prompt, cands, rounds=req.r)
+    cands = debate.answers
+    missing["debate"] = debate.failed_calls
 
     # 3) Judge with m counterfactual views (swap A/B)
-    a_text = cands[0].text
-    b_text = cands[1].text if len(cands) > 1 else cands[0].text
+    a_text = cands[0]
+    b_text = cands[1] if len(cands) > 1 else cands[0]
 
-    decisions = []
     judge_params = GenParams(temperature=0.2, top_p=0.9, max_tokens=220)
     # View 1: A,B
     judge_p1 = JUDGE_TEMPLATE.format(problem=req.prompt, a=a_text, b=b_text)
     # View 2: B,A
     judge_p2 = JUDGE_TEMPLATE.format(problem=req.prompt, a=b_text, b=a_text)
-    for p in [judge_p1, judge_p2][: max(1, req.m)]:
-        out = await client.generate(CompletionRequest(model=req.model, prompt=p, params=judge_params))
-        parsed = extract_json_object(out.text) or {
+    judge_reqs = [
+        CompletionRequest(model=req.model, prompt=p, params=judge_params)
+        for p in [judge_p1, judge_p2][: max(1, req.m)]
+    ]
+    judge_texts = await run_stage("judge", judge_reqs)
+    missing["judge"] = sum(t is None for t in judge_texts)
+
+    decisions = []
+    for text in judge_texts:
+        parsed = extract_json_object(text or "") or {
             "winner": "Tie",
             "score_delta": 0,
             "pos_swap_consistency": False,
@@ -108,10 +217,55 @@ async def consensus(req: ConsensusRequest) -> dict:
 
     cand_a = Candidate(answer=a_text, rationale="", citations=[])
     cand_b = Candidate(answer=b_text, rationale="", citations=[])
+    debate_meta = {
+        "rounds": debate.rounds,
+        "max_rounds": req.r,
+        "agents": req.k,
+        "calls": debate.calls,
+        "failed_calls": debate.failed_calls,
+        "failed_agents": debate.failed_agents,
+        "active_per_round": debate.active_per_round,
+        "converged": debate.converged,
+    }
     out_path = os.getenv("PAIRS_OUT", "./data/pairs.v1.jsonl")
     builder = PairBuilder(out_path)
-    rec = builder.add_pair(req.prompt, cand_a, cand_b, final_decision, debate_meta={"rounds": req.r, "agents": req.k})
-    await client.aclose()
-    return {"decisions": decisions, "final": final_decision, "pair_written": bool(rec), "pairs_path": out_path}
+    rec = builder.add_pair(req.prompt, cand_a, cand_b, final_decision, debate_meta=debate_meta)
+    return {
+        "decisions": decisions,
+        "final": final_decision,
+        "pair_written": bool(rec),
+        "pairs_path": out_path,
+        "debate": debate_meta,
+        "partial": any(missing.values()),
+        "missing": missing,
+    }
+
+
+@app.post("/consensus")
+async def consensus(
+    req: ConsensusRequest,
+    x_tenant: str = Header("default"),
+    x_priority: Optional[str] = Header(None),
+) -> dict:
+    # Bulk by default so sweeps cannot starve interactive /generate traffic
+    priority = _priority(x_priority, "bulk")
+    # Upper bound in provider calls: k generations, 2 per agent per round, m judges
+    cost = req.k * (1 + 2 * req.r) + max(1, req.m)
+    async with admission.slot(x_tenant, req.model, priority, cost=cost):
+        return await _consensus(req)
+
 
+async def _consensus(req: ConsensusRequest) -> dict:
+    if req.distributed:
+        from libs.consensus_dpo.ipc import RedisDispatcher
 
+        dispatcher = RedisDispatcher(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        try:
+            return await _run_consensus(req, _distributed_runner(dispatcher, req.timeout_s))
+        finally:
+            await dispatcher.aclose()
+    client = make_provider()
+    try:
+        return await _run_consensus(req, _local_runner(client))
+    finally:
+        await client.aclose()
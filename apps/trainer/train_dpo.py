@@ -1,14 +1,15 @@
 from __future__ import annotations
 
+import argparse
 import os
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import datasets as hf_datasets
-import mlflow
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from trl import DPOConfig, DPOTrainer
+if TYPE_CHECKING:  # pragma: no cover
+    import datasets as hf_datasets
+
+# torch / transformers / trl / datasets / mlflow are imported inside the functions
+# that need them so `--help` and argument errors return immediately.
 
 
 @dataclass
@@ -24,22 +25,41 @@ class TrainArgs:
     output_dir: str = "./data/runs/dpo"
 
 
-def load_pairs_dataset(path: str) -> hf_datasets.Dataset:
-    ds = hf_datasets.load_dataset("json", data_files=path, split="train")
+def load_pairs_dataset(path: str) -> "hf_datasets.Dataset":
+    """Load a pairs JSONL file, or the train shards of a shard manifest/directory."""
+    import datasets as hf_datasets
+
+    from libs.consensus_dpo.datasets.shards import ShardedPairs, is_manifest
+
+    data_files = ShardedPairs(path, "train").shard_paths() if is_manifest(path) else path
+    ds = hf_datasets.load_dataset("json", data_files=data_files, split="train")
     return ds
 
 
 def get_tokenizer_and_model(model_name: str):
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
     tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
     tokenizer.pad_token = tokenizer.eos_token
     model = AutoModelForCausalLM.from_pretrained(model_name)
     return tokenizer, model
 
 
-def main() -> None:
-    pairs_path = os.environ.get("DPO_PAIRS_PATH", "./data/pairs.v1.jsonl")
-    model_name = os.environ.get("STUDENT_MODEL", "gpt2")
-    args = TrainArgs(model_name=model_name)
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DPO training on consensus pairs")
+    parser.add_argument("--pairs", default=os.environ.get("DPO_PAIRS_PATH", "./data/pairs.v1.jsonl"))
+    parser.add_argument("--model", default=os.environ.get("STUDENT_MODEL", "gpt2"))
+    parser.add_argument("--output-dir", default=TrainArgs.output_dir)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    cli = parse_args(argv)
+    pairs_path = cli.pairs
+    args = TrainArgs(model_name=cli.model, output_dir=cli.output_dir)
+
+    import mlflow
+    from trl import DPOConfig, DPOTrainer
 
     mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000"))
     mlflow.set_experiment(os.getenv("MLFLOW_EXPERIMENT_NAME", "consensus-dpo"))
@@ -85,7 +105,7 @@ def main() -> None:
         tokenizer.save_pretrained(args.output_dir)
 
 
-if __name__ == "main":
+if __name__ == "__main__":
     main()
 
 
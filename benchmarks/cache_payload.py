@@ -0,0 +1,111 @@
+"""Bytes-per-entry and decode time: legacy raw-JSON cache rows vs compact blobs.
+
+Usage: python -m benchmarks.cache_payload [n_entries]
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+from libs.consensus_dpo.provider.cache import (
+    SqliteCache,
+    compact_chat_response,
+    decode_value,
+    encode_value,
+)
+
+
+WORDS = "the answer follows from step one because evidence cited doc shows that value is".split()
+
+
+def fake_response(rng: random.Random, n_words: int = 350) -> Dict[str, Any]:
+    content = " ".join(rng.choice(WORDS) for _ in range(n_words))
+    return {
+        "id": f"chatcmpl-{rng.getrandbits(64):x}",
+        "object": "chat.completion",
+        "created": 1760000000 + rng.randint(0, 10**6),
+        "model": "openai/gpt-oss-120b",
+        "system_fingerprint": f"fp_{rng.getrandbits(32):x}",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "reasoning_content": content[:400]},
+                "logprobs": None,
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 180, "completion_tokens": 460, "total_tokens": 640},
+    }
+
+
+def _timeit(fn, values, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for v in values:
+            fn(v)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(values) * 1e6
+
+
+def _db_bytes_per_entry(rows, n: int) -> float:
+    fd, path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expiry INTEGER)")
+        conn.executemany("INSERT INTO cache VALUES (?, ?, NULL)", rows)
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        return os.path.getsize(path) / n
+    finally:
+        os.remove(path)
+
+
+def _get_us(rows, level: int) -> float:
+    """End-to-end `SqliteCache.get` latency, which is what a cache hit actually costs."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SqliteCache(os.path.join(tmp, "cache.sqlite"), compress_level=level)
+        for i, value in enumerate(rows):
+            cache.set(str(i), {}, value)
+        return _timeit(lambda i: cache.get(str(i), {}), range(len(rows)), repeat=3)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(0)
+    raws = [fake_response(rng) for _ in range(n)]
+    legacy = [json.dumps(r, ensure_ascii=False) for r in raws]
+    values = [compact_chat_response(r) for r in raws]
+    compact = {level: [encode_value(v, level=level) for v in values] for level in (0, 1, 6)}
+
+    def legacy_decode(s: str) -> str:
+        return json.loads(s)["choices"][0]["message"]["content"]
+
+    def compact_decode(b: bytes) -> str:
+        return decode_value(b)["text"]
+
+    keys = [SqliteCache._hash_key(str(i), {}) for i in range(n)]
+    report: Dict[str, Any] = {
+        "entries": n,
+        "legacy_value_bytes": round(sum(len(s.encode()) for s in legacy) / n, 1),
+        "legacy_db_bytes_per_entry": round(_db_bytes_per_entry(zip(keys, legacy), n), 1),
+        "legacy_decode_us": round(_timeit(legacy_decode, legacy), 2),
+    }
+    for level, blobs in compact.items():
+        name = f"compact_l{level}"
+        report[f"{name}_value_bytes"] = round(sum(len(b) for b in blobs) / n, 1)
+        report[f"{name}_db_bytes_per_entry"] = round(_db_bytes_per_entry(zip(keys, blobs), n), 1)
+        report[f"{name}_decode_us"] = round(_timeit(compact_decode, blobs), 2)
+        report[f"{name}_get_us"] = round(_get_us(values, level), 1)
+    print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cold-start import time per entry point.
+
+Each entry point is imported in a fresh interpreter (best of N runs, minus a
+bare `python -c pass` baseline). Append results to a JSONL file with `--out`
+to track regressions over time.
+
+Usage: python -m benchmarks.import_time [--runs 5] [--out bench/import_time.jsonl]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Optional
+
+
+ENTRY_POINTS: Dict[str, str] = {
+    "provider": "import libs.consensus_dpo.provider",
+    "orchestrator": "import apps.orchestrator.main",
+    "retriever": "import apps.retriever.main",
+    "evaluator": "import apps.evaluator.main",
+    "trainer": "import apps.trainer.train_dpo",
+    "generator-worker": "import runpy; runpy.run_path('apps/generator-worker/main.py', run_name='bench')",
+    "debate-worker": "import runpy; runpy.run_path('apps/debate-worker/main.py', run_name='bench')",
+    "judge-worker": "import runpy; runpy.run_path('apps/judge-worker/main.py', run_name='bench')",
+}
+
+
+def _time_once(code: str, cwd: str) -> Optional[float]:
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True)
+    elapsed = time.perf_counter() - t0
+    return elapsed if proc.returncode == 0 else None
+
+
+def measure(code: str, runs: int, cwd: str) -> Optional[float]:
+    samples = [_time_once(code, cwd) for _ in range(runs)]
+    if any(s is None for s in samples):
+        return None  # entry point failed to import (missing optional deps)
+    return min(samples)  # type: ignore[type-var]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", default=None, help="append a JSONL record here")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    baseline = measure("pass", args.runs, root) or 0.0
+    results: Dict[str, Optional[float]] = {}
+    for name, code in ENTRY_POINTS.items():
+        t = measure(code, args.runs, root)
+        results[name] = round((t - baseline) * 1000, 1) if t is not None else None
+
+    record = {"ts": int(time.time()), "baseline_ms": round(baseline * 1000, 1), "import_ms": results}
+    print(json.dumps(record, indent=2))
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
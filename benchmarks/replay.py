@@ -0,0 +1,58 @@
+"""Replay throughput: record N synthetic exchanges, then serve them from the cassette.
+
+Usage: python -m benchmarks.replay [n_exchanges]
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from libs.consensus_dpo.provider.base import Completion, CompletionRequest, GenParams, ModelProvider
+from libs.consensus_dpo.provider.cassette import RecordingProvider, ReplayProvider
+
+
+class _EchoProvider(ModelProvider):
+    async def generate(self, req: CompletionRequest) -> Completion:
+        text = ("answer for " + req.prompt + " ") * 40
+        usage = {"prompt_tokens": 180, "completion_tokens": 460, "total_tokens": 640}
+        return Completion(model=req.model, prompt=req.prompt, text=text, usage=usage, finish_reason="stop")
+
+    async def batchGenerate(self, reqs: List[CompletionRequest]) -> List[Completion]:  # noqa: N802
+        return [await self.generate(r) for r in reqs]
+
+
+async def _run(n: int) -> None:
+    params = GenParams(temperature=0.9, top_p=0.95, max_tokens=512)
+    reqs = [CompletionRequest(model="gpt-oss-120b", prompt=f"problem {i}", params=params) for i in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sweep.cassette")
+        recorder = RecordingProvider(_EchoProvider(), path)
+        t0 = time.perf_counter()
+        await recorder.batchGenerate(reqs)
+        await recorder.aclose()
+        record_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        replay = ReplayProvider(path)  # first open builds the sorted index
+        open_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        outs = await replay.batchGenerate(reqs)
+        replay_s = time.perf_counter() - t0
+        assert all(o.text.startswith("answer for problem") for o in outs)
+        print(
+            {
+                "exchanges": n,
+                "cassette_bytes_per_exchange": round(os.path.getsize(path) / n, 1),
+                "record_us": round(record_s / n * 1e6, 2),
+                "index_build_ms": round(open_s * 1000, 1),
+                "replay_us": round(replay_s / n * 1e6, 2),
+            }
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(_run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
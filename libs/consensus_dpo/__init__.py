@@ -6,6 +6,7 @@ scoring, bias probes, telemetry, and IPC helpers shared across services.
 
 __all__ = [
     "provider",
+    "ipc",
 ]
 
 
@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+from .scheduler import AdmissionController, AdmissionRejected
+
+__all__ = ["AdmissionController", "AdmissionRejected"]
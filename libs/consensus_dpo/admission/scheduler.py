@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+
+DEFAULT_CLASS_WEIGHTS = {"interactive": 8.0, "bulk": 1.0}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a job cannot be admitted; maps onto an HTTP 429/503."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+Flow = Tuple[str, str, str]  # (priority class, tenant, model)
+
+
+@dataclass(order=True)
+class _Waiter:
+    finish_tag: float
+    seq: int
+    flow: Flow = field(compare=False)
+    cost: float = field(compare=False)
+    future: "asyncio.Future[None]" = field(compare=False)
+
+
+class AdmissionController:
+    """Bounded admission with weighted fair queuing across flows.
+
+    A flow is (priority class, tenant, model). At most `max_concurrency` jobs
+    run at once; waiting jobs are released in order of their WFQ virtual finish
+    tag, so each flow gets service in proportion to its class weight and no
+    single tenant or bulk sweep can starve the others. Queued work is measured
+    in `cost` (provider calls): work beyond `max_queued` (503) or
+    `max_queued_per_tenant` (429) is rejected right away with a Retry-After
+    estimate, as is work that waits longer than `max_wait_s`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_queued: float = 256,
+        max_queued_per_tenant: float = 64,
+        max_wait_s: float = 30.0,
+        class_weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.max_wait_s = max_wait_s
+        self.class_weights = class_weights or dict(DEFAULT_CLASS_WEIGHTS)
+        self._running = 0
+        self._heap: List[_Waiter] = []
+        self._queued_cost = 0.0
+        self._queued_jobs = 0
+        self._queued_cost_by_tenant: Dict[str, float] = {}
+        self._queued_by_flow: Dict[Flow, int] = {}
+        self._last_finish: Dict[Flow, float] = {}
+        # Drained flows whose finish tag is still ahead of `_vtime`, pruned as it advances
+        self._idle: List[Tuple[float, Flow]] = []
+        self._vtime = 0.0
+        self._seq = itertools.count()
+        self._avg_unit_s = 1.0  # EWMA of service time per unit cost, seeds Retry-After
+
+    @property
+    def queued(self) -> float:
+        return self._queued_cost
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "running": self._running,
+            "queued_jobs": self._queued_jobs,
+            "queued_cost": self._queued_cost,
+            "queued_cost_by_tenant": dict(self._queued_cost_by_tenant),
+            "flows": len(self._last_finish),
+            "avg_unit_s": round(self._avg_unit_s, 3),
+        }
+
+    def _retry_after(self, cost: float) -> int:
+        backlog = self._queued_cost + cost
+        return max(1, math.ceil(self._avg_unit_s * backlog / self.max_concurrency))
+
+    def _finish_tag(self, flow: Flow, cost: float) -> float:
+        weight = self.class_weights.get(flow[0], 1.0)
+        start = max(self._vtime, self._last_finish.get(flow, 0.0))
+        tag = start + cost / weight
+        self._last_finish[flow] = tag
+        return tag
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        heapq.heappush(self._heap, waiter)
+        tenant = waiter.flow[1]
+        self._queued_cost += waiter.cost
+        self._queued_jobs += 1
+        self._queued_cost_by_tenant[tenant] = self._queued_cost_by_tenant.get(tenant, 0.0) + waiter.cost
+        self._queued_by_flow[waiter.flow] = self._queued_by_flow.get(waiter.flow, 0) + 1
+
+    def _dequeue(self, waiter: _Waiter) -> None:
+        """Drop a waiter from the accounting (granted or abandoned)."""
+        flow, tenant = waiter.flow, waiter.flow[1]
+        self._queued_cost -= waiter.cost
+        self._queued_jobs -= 1
+        left = self._queued_cost_by_tenant[tenant] - waiter.cost
+        if left <= 1e-9:
+            del self._queued_cost_by_tenant[tenant]
+        else:
+            self._queued_cost_by_tenant[tenant] = left
+        self._queued_by_flow[flow] -= 1
+        if self._queued_by_flow[flow] == 0:
+            del self._queued_by_flow[flow]
+            heapq.heappush(self._idle, (self._last_finish[flow], flow))
+        self._prune_idle()
+
+    def _prune_idle(self) -> None:
+        # A drained flow whose tag is at or below vtime would restart at vtime anyway
+        while self._idle and self._idle[0][0] <= self._vtime:
+            tag, flow = heapq.heappop(self._idle)
+            if flow not in self._queued_by_flow and self._last_finish.get(flow) == tag:
+                del self._last_finish[flow]
+        if not self._queued_jobs:
+            # System drained: every flow restarts at vtime, no history to keep
+            self._last_finish.clear()
+            self._idle.clear()
+
+    def _release(self) -> None:
+        self._running -= 1
+        while self._heap:
+            waiter = heapq.heappop(self._heap)
+            if waiter.future.done():  # cancelled or timed out while queued
+                continue
+            self._vtime = waiter.finish_tag
+            self._dequeue(waiter)
+            self._running += 1
+            waiter.future.set_result(None)
+            return
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        # The heap entry stays behind and is skipped when popped
+        waiter.future.cancel()
+        self._dequeue(waiter)
+
+    async def _acquire(self, tenant: str, model: str, priority: str, cost: float) -> None:
+        while self._heap and self._heap[0].future.done():
+            heapq.heappop(self._heap)
+        if self._running < self.max_concurrency and not self._heap:
+            self._running += 1
+            return
+        # A lone job larger than the bound is still admitted into an empty queue
+        if self._queued_cost and self._queued_cost + cost > self.max_queued:
+            raise AdmissionRejected(503, "orchestrator saturated", self._retry_after(cost))
+        tenant_cost = self._queued_cost_by_tenant.get(tenant, 0.0)
+        if tenant_cost and tenant_cost + cost > self.max_queued_per_tenant:
+            raise AdmissionRejected(
+                429, f"too much queued work for tenant {tenant!r}", self._retry_after(cost)
+            )
+
+        flow = (priority, tenant, model)
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(self._finish_tag(flow, cost), next(self._seq), flow, cost, future)
+        self._enqueue(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait_s)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                return  # granted in the same tick the timeout fired
+            self._abandon(waiter)
+            raise AdmissionRejected(503, "queued too long", self._retry_after(cost)) from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # slot was handed to us; pass it on
+            else:
+                self._abandon(waiter)
+            raise
+
+    @asynccontextmanager
+    async def slot(
+        self, tenant: str = "default", model: str = "", priority: str = "bulk", cost: float = 1.0
+    ) -> AsyncIterator[None]:
+        """Hold a run slot for the duration of the block; `cost` is in provider calls."""
+        await self._acquire(tenant, model, priority, cost)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._avg_unit_s = 0.8 * self._avg_unit_s + 0.2 * elapsed / max(cost, 1e-9)
+            self._release()
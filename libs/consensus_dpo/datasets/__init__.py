@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from .pairs import PairRecord, PairBuilder
+from .shards import ShardedPairs, iter_pairs, shuffle_split_shard
 
-__all__ = ["PairRecord", "PairBuilder"]
+__all__ = ["PairRecord", "PairBuilder", "ShardedPairs", "iter_pairs", "shuffle_split_shard"]
 
 
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import json
+import math
+import mmap
+import os
+import tempfile
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+MANIFEST_NAME = "manifest.json"
+
+
+def prompt_hash(prompt: str, salt: str = "") -> int:
+    """64-bit stable hash of a prompt; decides the split so no prompt leaks."""
+    digest = hashlib.sha256((salt + prompt).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _shuffle_key(seed: int, line: bytes) -> int:
+    digest = hashlib.sha256(seed.to_bytes(8, "big", signed=True) + line).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def assign_split(prompt: str, dev_fraction: float, salt: str = "") -> str:
+    return "dev" if prompt_hash(prompt, salt) % 1_000_000 < dev_fraction * 1_000_000 else "train"
+
+
+class _BucketSpool:
+    """Buffered writes to many bucket files through a bounded pool of open handles.
+
+    Records are buffered per bucket; once `buffer_bytes` is exceeded the
+    largest buffers are appended to disk, reusing at most `max_open` file
+    descriptors (LRU), so fan-out is not limited by `ulimit -n`.
+    """
+
+    def __init__(self, paths: List[str], max_open: int, buffer_bytes: int) -> None:
+        self.paths = paths
+        self.max_open = max(1, max_open)
+        self.buffer_bytes = buffer_bytes
+        self._bufs: Dict[int, List[bytes]] = {}
+        self._sizes: Dict[int, int] = {}
+        self._total = 0
+        self._handles: "OrderedDict[int, Any]" = OrderedDict()
+
+    def write(self, bucket: int, data: bytes) -> None:
+        self._bufs.setdefault(bucket, []).append(data)
+        self._sizes[bucket] = self._sizes.get(bucket, 0) + len(data)
+        self._total += len(data)
+        if self._total > self.buffer_bytes:
+            # Flush largest-first down to half the budget: few, large appends
+            for b in sorted(self._sizes, key=self._sizes.__getitem__, reverse=True):
+                self._flush(b)
+                if self._total <= self.buffer_bytes // 2:
+                    break
+
+    def _handle(self, bucket: int) -> Any:
+        h = self._handles.get(bucket)
+        if h is not None:
+            self._handles.move_to_end(bucket)
+            return h
+        if len(self._handles) >= self.max_open:
+            _, old = self._handles.popitem(last=False)
+            old.close()
+        h = open(self.paths[bucket], "ab")
+        self._handles[bucket] = h
+        return h
+
+    def _flush(self, bucket: int) -> None:
+        chunks = self._bufs.pop(bucket, None)
+        if not chunks:
+            return
+        self._handle(bucket).write(b"".join(chunks))
+        self._total -= self._sizes.pop(bucket)
+
+    def close(self) -> None:
+        try:
+            for b in list(self._bufs):
+                self._flush(b)
+        finally:
+            for h in self._handles.values():
+                h.close()
+            self._handles.clear()
+
+
+def _sorted_bucket(path: str, max_bytes: int) -> Iterator[bytes]:
+    """Records of one bucket in shuffle-key order, holding at most ~`max_bytes` at once.
+
+    Buckets that came out larger than planned (hash variance, key prefixes) are
+    range-partitioned by key into sub-buckets first; ranges are visited in key
+    order, so the output is the same as sorting the whole bucket.
+    """
+    size = os.path.getsize(path)
+    if size > max_bytes:
+        parts = math.ceil(size / max_bytes) + 1
+        sub_paths = [f"{path}.{p}" for p in range(parts)]
+        handles = [open(p, "wb") for p in sub_paths]
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    handles[int(line[:16], 16) * parts >> 64].write(line)
+        finally:
+            for h in handles:
+                h.close()
+        # A single key range holding everything (e.g. duplicate records) cannot shrink
+        if max(os.path.getsize(p) for p in sub_paths) < size:
+            os.remove(path)
+            for sub in sub_paths:
+                yield from _sorted_bucket(sub, max_bytes)
+            return
+        for sub in sub_paths:
+            os.remove(sub)
+    # Fits in memory by construction; order within it by shuffle key
+    with open(path, "rb") as f:
+        entries = [line.split(b"\t", 1) for line in f]
+    os.remove(path)
+    entries.sort()
+    for _, line in entries:
+        yield line
+
+
+def _write_shards(
+    split: str, bucket_paths: List[str], out_dir: str, shard_size: int, max_bucket_bytes: int
+) -> Dict[str, Any]:
+    shards: List[Dict[str, Any]] = []
+    out = None
+    offsets = array("Q")
+
+    def close_shard() -> None:
+        nonlocal out, offsets
+        if out is None:
+            return
+        offsets.append(out.tell())  # end offset; record i spans offsets[i]..offsets[i+1]
+        out.close()
+        with open(os.path.join(out_dir, shards[-1]["index"]), "wb") as f:
+            offsets.tofile(f)
+        shards[-1]["records"] = len(offsets) - 1
+        out, offsets = None, array("Q")
+
+    for path in bucket_paths:
+        if not os.path.exists(path):
+            continue  # bucket received no records
+        for line in _sorted_bucket(path, max_bucket_bytes):
+            if out is None or len(offsets) >= shard_size:
+                close_shard()
+                name = f"{split}-{len(shards):05d}"
+                shards.append({"path": name + ".jsonl", "index": name + ".idx", "records": 0})
+                out = open(os.path.join(out_dir, name + ".jsonl"), "wb")
+            offsets.append(out.tell())
+            out.write(line)
+    close_shard()
+    return {"records": sum(s["records"] for s in shards), "shards": shards}
+
+
+def shuffle_split_shard(
+    in_path: str,
+    out_dir: str,
+    dev_fraction: float = 0.05,
+    seed: int = 0,
+    shard_size: int = 50_000,
+    max_bucket_bytes: int = 64 * 1024 * 1024,
+    split_salt: str = "",
+    max_open_files: int = 64,
+    spool_buffer_bytes: int = 32 * 1024 * 1024,
+) -> Dict[str, Any]:
+    """Shuffle, split train/dev by prompt hash and shard a pairs JSONL in bounded memory.
+
+    Pass 1 streams the input once, assigns each record to a split by prompt
+    hash and hash-partitions it into temp buckets by a seeded shuffle key. Pass
+    2 sorts one bucket at a time and writes fixed-size shards plus `.idx` files
+    of uint64 byte offsets. Output depends only on input content and `seed`.
+    Every split gets enough buckets to hold the whole input under
+    `max_bucket_bytes`, so the bound holds however the prompts split, and
+    pass 2 re-splits any bucket that still overshoots. Bucket writes go
+    through a spool holding at most `max_open_files` descriptors and
+    `spool_buffer_bytes` of buffered records.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    size = os.path.getsize(in_path)
+    # Sized from the whole input, not `dev_fraction`: prompt-hash splits can be
+    # arbitrarily skewed, while the shuffle key spreads either split evenly
+    n_buckets = max(1, math.ceil(size / max_bucket_bytes))
+
+    with tempfile.TemporaryDirectory(dir=out_dir, prefix=".shuffle-") as tmp:
+        bucket_paths = {
+            split: [os.path.join(tmp, f"{split}-{b:05d}") for b in range(n_buckets)]
+            for split in ("train", "dev")
+        }
+        # One spool shared by both splits so the descriptor cap is global
+        offsets = {"train": 0, "dev": n_buckets}
+        spool = _BucketSpool(
+            bucket_paths["train"] + bucket_paths["dev"], max_open_files, spool_buffer_bytes
+        )
+        try:
+            with open(in_path, "rb") as f:
+                for lineno, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    if not line.endswith(b"\n"):
+                        line += b"\n"
+                    try:
+                        prompt = json.loads(line).get("prompt", "")
+                    except ValueError as exc:
+                        raise ValueError(f"{in_path}:{lineno}: invalid JSON: {exc}") from None
+                    split = assign_split(prompt, dev_fraction, split_salt)
+                    key = _shuffle_key(seed, line)
+                    # Zero-padded hex sorts like the integer key
+                    spool.write(offsets[split] + key % n_buckets, b"%016x\t" % key + line)
+        finally:
+            spool.close()
+
+        manifest: Dict[str, Any] = {
+            "source": os.path.abspath(in_path),
+            "seed": seed,
+            "dev_fraction": dev_fraction,
+            "split_salt": split_salt,
+            "splits": {
+                split: _write_shards(split, paths, out_dir, shard_size, max_bucket_bytes)
+                for split, paths in bucket_paths.items()
+            },
+        }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class ShardedPairs:
+    """Random access and per-worker streaming over shards from `shuffle_split_shard`."""
+
+    def __init__(self, manifest_path: str, split: str = "train") -> None:
+        if os.path.isdir(manifest_path):
+            manifest_path = os.path.join(manifest_path, MANIFEST_NAME)
+        self.root = os.path.dirname(os.path.abspath(manifest_path))
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.split = split
+        self.shards: List[Dict[str, Any]] = self.manifest["splits"][split]["shards"]
+        self._starts: List[int] = []
+        total = 0
+        for shard in self.shards:
+            self._starts.append(total)
+            total += shard["records"]
+        self._len = total
+        self._offsets: Dict[int, memoryview] = {}
+
+    def __len__(self) -> int:
+        return self._len
+
+    def shard_paths(self) -> List[str]:
+        return [os.path.join(self.root, s["path"]) for s in self.shards]
+
+    def _shard_offsets(self, shard_id: int) -> memoryview:
+        view = self._offsets.get(shard_id)
+        if view is None:
+            path = os.path.join(self.root, self.shards[shard_id]["index"])
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mm).cast("Q")
+            self._offsets[shard_id] = view
+        return view
+
+    def _locate(self, i: int) -> Tuple[int, int]:
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        shard_id = bisect.bisect_right(self._starts, i) - 1
+        return shard_id, i - self._starts[shard_id]
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        shard_id, local = self._locate(i)
+        offsets = self._shard_offsets(shard_id)
+        start, end = offsets[local], offsets[local + 1]
+        with open(os.path.join(self.root, self.shards[shard_id]["path"]), "rb") as f:
+            f.seek(start)
+            return json.loads(f.read(end - start))
+
+    def iter_records(self, rank: int = 0, world_size: int = 1) -> Iterator[Dict[str, Any]]:
+        """Stream whole shards assigned round-robin to `rank` of `world_size` workers."""
+        for shard_id, path in enumerate(self.shard_paths()):
+            if shard_id % world_size != rank:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+
+
+def is_manifest(path: str) -> bool:
+    return os.path.isdir(path) or os.path.basename(path) == MANIFEST_NAME
+
+
+def iter_pairs(path: str, split: str = "train", rank: int = 0, world_size: int = 1) -> Iterator[Dict[str, Any]]:
+    """Yield pair records from a plain JSONL file or a shard manifest/directory."""
+    if is_manifest(path):
+        yield from ShardedPairs(path, split).iter_records(rank, world_size)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Shuffle, split by prompt and shard a pairs JSONL")
+    parser.add_argument("in_path")
+    parser.add_argument("out_dir")
+    parser.add_argument("--dev-fraction", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=50_000, help="records per shard")
+    parser.add_argument("--max-bucket-mb", type=int, default=64, help="memory bound for pass 2")
+    parser.add_argument("--max-open-files", type=int, default=64, help="descriptor bound for pass 1")
+    args = parser.parse_args(argv)
+    manifest = shuffle_split_shard(
+        args.in_path,
+        args.out_dir,
+        dev_fraction=args.dev_fraction,
+        seed=args.seed,
+        shard_size=args.shard_size,
+        max_bucket_bytes=args.max_bucket_mb * 1024 * 1024,
+        max_open_files=args.max_open_files,
+    )
+    print({split: (m["records"], len(m["shards"])) for split, m in manifest["splits"].items()})
+
+
+if __name__ == "__main__":
+    main()
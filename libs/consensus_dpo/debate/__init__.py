@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+from .engine import DebateEngine, DebateResult, truncate_to_tokens
+
+__all__ = ["DebateEngine", "DebateResult", "truncate_to_tokens"]
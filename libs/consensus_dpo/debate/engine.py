@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from ..prompts import DEBATE_R1_TEMPLATE, DEBATE_R2_TEMPLATE
+from ..provider.base import CompletionRequest, GenParams
+from ..utils.json_utils import extract_json_object
+
+
+# Completes a batch of requests concurrently; None marks a failed/missing call
+Complete = Callable[[List[CompletionRequest]], Awaitable[List[Optional[str]]]]
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cap `text` at roughly `budget` tokens (~4 chars/token heuristic)."""
+    limit = budget * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + " …"
+
+
+def extract_answer(text: str) -> str:
+    """The `answer` field of a generator/defense JSON reply, else the stripped text."""
+    parsed = extract_json_object(text)
+    if isinstance(parsed, dict) and isinstance(parsed.get("answer"), str):
+        return parsed["answer"].strip()
+    return text.strip()
+
+
+def _parse_defense(text: str) -> Optional[Tuple[str, Optional[bool]]]:
+    """(answer, changed) from an R2 reply, or None if it carries no answer."""
+    parsed = extract_json_object(text)
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("answer"), str):
+        return None
+    changed = parsed.get("changed")
+    return parsed["answer"].strip(), changed if isinstance(changed, bool) else None
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def _majority(answers: List[str]) -> Optional[str]:
+    """Normalized answer held by more than half of the agents, if any."""
+    counts = Counter(_normalize(a) for a in answers)
+    top, n = counts.most_common(1)[0] if counts else ("", 0)
+    return top if n * 2 > len(answers) else None
+
+
+@dataclass
+class DebateResult:
+    answers: List[str]
+    rounds: int = 0
+    calls: int = 0
+    failed_calls: int = 0
+    active_per_round: List[int] = field(default_factory=list)
+    failed_agents: List[int] = field(default_factory=list)
+    converged: bool = False
+
+
+class DebateEngine:
+    """Multi-round cross-examination / defense debate over k candidate answers.
+
+    Agents sit on a ring: in R1 agent i critiques agent (i+1) % k's answer
+    against its own, and in R2 each critiqued agent defends or revises given
+    that critique and the other agents' current answers; all calls of a phase
+    run concurrently. Only agents outside the majority answer take part in a
+    round, so calls scale with disagreement rather than R×k; the debate stops
+    once every answer agrees or a round changes nothing. Agents whose calls
+    fail or return no parseable answer drop out with their last answer.
+    Peer context is truncated to `token_budget` to keep prompts bounded.
+    """
+
+    def __init__(
+        self,
+        complete: Complete,
+        model: str,
+        token_budget: int = 400,
+        critique_params: Optional[GenParams] = None,
+        defense_params: Optional[GenParams] = None,
+    ) -> None:
+        self.complete = complete
+        self.model = model
+        self.token_budget = token_budget
+        self.critique_params = critique_params or GenParams(temperature=0.7, top_p=0.9, max_tokens=180)
+        self.defense_params = defense_params or GenParams(temperature=0.7, top_p=0.9, max_tokens=200)
+
+    def _active(self, answers: List[str], failed: List[int]) -> List[int]:
+        majority = _majority(answers)
+        return [i for i, a in enumerate(answers) if i not in failed and _normalize(a) != majority]
+
+    def _peers(self, answers: List[str], i: int) -> str:
+        # Split the budget so every other agent's answer is represented
+        share = max(1, self.token_budget // max(1, len(answers) - 1))
+        return "\n".join(
+            f"- {truncate_to_tokens(a, share)}" for j, a in enumerate(answers) if j != i
+        )
+
+    async def run(self, problem: str, answers: List[str], rounds: int) -> DebateResult:
+        answers = [extract_answer(a) for a in answers]
+        k = len(answers)
+        result = DebateResult(answers=answers)
+        failed: List[int] = []
+        active = self._active(answers, failed) if k > 1 else []
+        for _ in range(rounds):
+            if not active:
+                break
+            result.rounds += 1
+            result.active_per_round.append(len(active))
+
+            # R1: agent (j-1) % k cross-examines each active agent j's answer
+            critique_reqs = [
+                CompletionRequest(
+                    model=self.model,
+                    prompt=DEBATE_R1_TEMPLATE.format(
+                        problem=problem,
+                        own=truncate_to_tokens(answers[(j - 1) % k], self.token_budget),
+                        peer=truncate_to_tokens(answers[j], self.token_budget),
+                    ),
+                    params=self.critique_params,
+                )
+                for j in active
+            ]
+            critiques = await self.complete(critique_reqs)
+            result.calls += len(critique_reqs)
+
+            defending: List[Tuple[int, str]] = []
+            for j, c in zip(active, critiques):
+                if c:
+                    defending.append((j, c))
+                else:
+                    result.failed_calls += 1
+                    failed.append(j)
+
+            # R2: defense/revision against the critique and the other current answers
+            defense_reqs = [
+                CompletionRequest(
+                    model=self.model,
+                    prompt=DEBATE_R2_TEMPLATE.format(
+                        problem=problem,
+                        self_prev=truncate_to_tokens(answers[j], self.token_budget),
+                        critique=truncate_to_tokens(c, self.token_budget),
+                        peers=self._peers(answers, j),
+                    ),
+                    params=self.defense_params,
+                )
+                for j, c in defending
+            ]
+            defenses = await self.complete(defense_reqs)
+            result.calls += len(defense_reqs)
+
+            # Apply revisions only after every defense saw the same round snapshot
+            moved = False
+            for (j, _), reply in zip(defending, defenses):
+                defense = _parse_defense(reply) if reply else None
+                if defense is None:
+                    result.failed_calls += 1
+                    failed.append(j)
+                    continue
+                revised, changed = defense
+                if changed is not False and _normalize(revised) != _normalize(answers[j]):
+                    answers[j] = revised
+                    moved = True
+            if not moved:
+                break
+            active = self._active(answers, failed)
+
+        result.failed_agents = sorted(failed)
+        result.converged = k <= 1 or len({_normalize(a) for a in answers}) == 1
+        return result
@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+from .queues import RedisDispatcher, push_reply, task_expired
+
+__all__ = ["RedisDispatcher", "push_reply", "task_expired"]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import orjson
+
+if TYPE_CHECKING:  # pragma: no cover
+    import redis
+
+
+def task_expired(task: Dict[str, Any], now: Optional[float] = None) -> bool:
+    """True once a dispatched task's `deadline` (epoch seconds) has passed.
+
+    Nobody awaits the reply any more, so workers should skip the provider call.
+    """
+    deadline = task.get("deadline")
+    return deadline is not None and (now if now is not None else time.time()) > deadline
+
+
+def push_reply(
+    r: "redis.Redis",
+    task: Dict[str, Any],
+    result: Dict[str, Any],
+    default_queue: str,
+    ttl_seconds: int = 300,
+) -> None:
+    """Worker side: route a result back to the job that produced `task`.
+
+    Tasks dispatched by `RedisDispatcher` carry a `reply_to` key; legacy tasks
+    without one keep going to the worker's shared output queue.
+    """
+    reply_to = task.get("reply_to")
+    if not reply_to:
+        r.rpush(default_queue, orjson.dumps(result))
+        return
+    pipe = r.pipeline(transaction=False)
+    pipe.rpush(reply_to, orjson.dumps(result))
+    # Orphaned reply lists (orchestrator gone) expire on their own
+    pipe.expire(reply_to, ttl_seconds)
+    pipe.execute()
+
+
+class RedisDispatcher:
+    """Orchestrator side: fan tasks out to worker queues and await replies by id.
+
+    Each `run` call gets its own reply list (`reply:<job>`); workers echo the
+    task id, so results are matched by correlation id regardless of order.
+    On timeout the results received so far are returned and the rest are None;
+    tasks carry a `deadline` so workers drop the ones still queued.
+    """
+
+    def __init__(self, url: str, reply_prefix: str = "reply") -> None:
+        # Only the orchestrator needs the asyncio client; workers import this module
+        # for push_reply and should not pay for redis.asyncio at cold start
+        import redis.asyncio as aioredis
+
+        self.reply_prefix = reply_prefix
+        self._r = aioredis.Redis.from_url(url)
+
+    async def run(
+        self, queue: str, tasks: List[Dict[str, Any]], timeout_s: float
+    ) -> List[Optional[Dict[str, Any]]]:
+        if not tasks:
+            return []
+        job = uuid.uuid4().hex
+        reply_key = f"{self.reply_prefix}:{job}"
+        ids = [f"{job}:{i}" for i in range(len(tasks))]
+        # Wall clock, since workers on other hosts compare against it
+        deadline = time.time() + timeout_s
+
+        pipe = self._r.pipeline(transaction=False)
+        for task_id, task in zip(ids, tasks):
+            envelope = {**task, "id": task_id, "reply_to": reply_key, "deadline": deadline}
+            pipe.rpush(queue, orjson.dumps(envelope))
+        await pipe.execute()
+
+        pending = set(ids)
+        results: Dict[str, Dict[str, Any]] = {}
+        deadline = time.monotonic() + timeout_s
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                item = await self._r.blpop([reply_key], timeout=remaining)
+                if item is None:
+                    break
+                result = orjson.loads(item[1])
+                task_id = result.get("id")
+                if task_id in pending:
+                    pending.discard(task_id)
+                    results[task_id] = result
+        finally:
+            await self._r.delete(reply_key)
+        return [results.get(task_id) for task_id in ids]
+
+    async def aclose(self) -> None:
+        await self._r.aclose()
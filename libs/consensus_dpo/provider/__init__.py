@@ -1,5 +1,22 @@
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from .base import ModelProvider, GenParams, Completion, CompletionRequest
-from .novita import NovitaClient, NovitaConfig
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cassette import RecordingProvider, ReplayProvider, make_provider
+    from .novita import NovitaClient, NovitaConfig
+
+# Heavy provider clients (httpx, pydantic-settings, tenacity, ...) load on first access
+_LAZY = {
+    "NovitaClient": ".novita",
+    "NovitaConfig": ".novita",
+    "RecordingProvider": ".cassette",
+    "ReplayProvider": ".cassette",
+    "make_provider": ".cassette",
+}
 
 __all__ = [
     "ModelProvider",
@@ -8,6 +25,15 @@ __all__ = [
     "CompletionRequest",
     "NovitaClient",
     "NovitaConfig",
+    "RecordingProvider",
+    "ReplayProvider",
+    "make_provider",
 ]
 
 
+def __getattr__(name: str) -> Any:
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
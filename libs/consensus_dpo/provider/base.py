@@ -14,13 +14,20 @@ class GenParams:
     stop: Optional[List[str]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Completion:
+    """Slotted completion record.
+
+    `raw` holds the full provider response only when the provider is configured
+    to keep it; lean completions carry just text, usage and finish reason.
+    """
+
     model: str
     prompt: str
     text: str
     usage: Dict[str, Any]
-    raw: Dict[str, Any]
+    finish_reason: Optional[str] = None
+    raw: Optional[Dict[str, Any]] = None
 
 
 @dataclass
@@ -48,4 +55,7 @@ class ModelProvider(abc.ABC):
     async def embeddings(self, texts: List[str]) -> List[List[float]]:  # pragma: no cover
         raise NotImplementedError
 
+    async def aclose(self) -> None:  # noqa: B027 - optional hook, no-op by default
+        """Release network sessions or file handles."""
+
 
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import glob
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX; in-process lock only
+    fcntl = None  # type: ignore[assignment]
+
+from .base import Completion, CompletionRequest, ModelProvider
+from .cache import decode_value, encode_value, hash_key, request_params
+
+
+# Index entry: 16-byte key digest, blob offset, blob length
+_ENTRY = struct.Struct("<16sQI")
+# Sorted index header: number of append-index entries it covers
+_SIDX_HEADER = struct.Struct("<Q")
+
+
+class CassetteMiss(KeyError):
+    """Raised by `ReplayProvider` when a request was never recorded."""
+
+
+def request_digest(req: CompletionRequest) -> bytes:
+    return bytes.fromhex(hash_key(req.prompt, request_params(req)))[:16]
+
+
+class CassetteWriter:
+    """Append-only archive of request/response exchanges.
+
+    `<path>` holds `encode_value` blobs back to back; `<path>.idx` gets one
+    fixed-width (digest, offset, length) entry per exchange. Offsets come from
+    the end of the file under an exclusive lock, so several writers (or
+    processes) on one path stay consistent; within a process, get writers via
+    `open_writer` to share one per path.
+    """
+
+    def __init__(self, path: str, compress_level: int = 6) -> None:
+        self.path = path
+        self.compress_level = compress_level
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._data = open(path, "ab")
+        self._index = open(path + ".idx", "ab")
+        self._lock = threading.Lock()
+
+    def append(self, req: CompletionRequest, out: Completion) -> None:
+        blob = encode_value(
+            {
+                "prompt": req.prompt,
+                "params": request_params(req),
+                "text": out.text,
+                "usage": out.usage,
+                "finish_reason": out.finish_reason,
+            },
+            self.compress_level,
+        )
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._data.fileno(), fcntl.LOCK_EX)
+            try:
+                # Not tell(): another writer may have appended since our last write
+                offset = self._data.seek(0, os.SEEK_END)
+                self._data.write(blob)
+                self._data.flush()
+                # Index written after the data so a crash never points past the end
+                self._index.write(_ENTRY.pack(request_digest(req), offset, len(blob)))
+                self._index.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._data.fileno(), fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        self._data.close()
+        self._index.close()
+
+
+_WRITERS: Dict[str, CassetteWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def open_writer(path: str) -> CassetteWriter:
+    """Process-wide writer for `path`; repeated calls return the same instance."""
+    key = os.path.abspath(path)
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = _WRITERS[key] = CassetteWriter(path)
+        return writer
+
+
+class Cassette:
+    """Read side: mmap'd data plus a digest-sorted index searched in O(log n).
+
+    The sorted index (`<path>.sidx`) is rebuilt only when the append index has
+    grown since it was written; if it cannot be saved, the in-memory copy is
+    used. Repeated requests map to several entries that are kept in recording
+    order.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entries = self._load_sorted_index()
+        self._count = len(self._entries) // _ENTRY.size
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def _load_sorted_index(self) -> memoryview:
+        idx_path, sidx_path = self.path + ".idx", self.path + ".sidx"
+        n = os.path.getsize(idx_path) // _ENTRY.size
+        if os.path.exists(sidx_path):
+            with open(sidx_path, "rb") as f:
+                (covered,) = _SIDX_HEADER.unpack(f.read(_SIDX_HEADER.size))
+                if covered == n:
+                    if n == 0:
+                        return memoryview(b"")
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    return memoryview(mm)[_SIDX_HEADER.size :]
+        with open(idx_path, "rb") as f:
+            raw = f.read(n * _ENTRY.size)
+        entries = [raw[i : i + _ENTRY.size] for i in range(0, len(raw), _ENTRY.size)]
+        # Stable on (digest, offset): duplicates stay in recording order
+        entries.sort(key=lambda e: (e[:16], _ENTRY.unpack(e)[1]))
+        sorted_raw = b"".join(entries)
+        self._save_sorted_index(sidx_path, _SIDX_HEADER.pack(n) + sorted_raw)
+        return memoryview(sorted_raw)
+
+    @staticmethod
+    def _save_sorted_index(sidx_path: str, data: bytes) -> None:
+        # Best effort: a unique temp name per writer keeps concurrent rebuilds from
+        # clobbering each other, and read-only dirs just skip the cache
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(sidx_path)),
+                prefix=os.path.basename(sidx_path) + ".",
+                suffix=".tmp",
+            )
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, sidx_path)
+        except OSError:
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _digest_at(self, i: int) -> bytes:
+        start = i * _ENTRY.size
+        return bytes(self._entries[start : start + 16])
+
+    def lookup(self, digest: bytes) -> List[Tuple[int, int]]:
+        """All (offset, length) entries recorded for `digest`, in recording order."""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._digest_at(mid) < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        out: List[Tuple[int, int]] = []
+        while lo < self._count and self._digest_at(lo) == digest:
+            _, offset, length = _ENTRY.unpack_from(self._entries, lo * _ENTRY.size)
+            out.append((offset, length))
+            lo += 1
+        return out
+
+    def read(self, offset: int, length: int) -> Dict[str, Any]:
+        return decode_value(bytes(self._data[offset : offset + length]))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._count):
+            _, offset, length = _ENTRY.unpack_from(self._entries, i * _ENTRY.size)
+            yield self.read(offset, length)
+
+
+class RecordingProvider(ModelProvider):
+    """Wrap a provider and append every exchange it serves to a cassette.
+
+    The writer is shared process-wide per path, so per-request providers
+    recording to the same cassette do not corrupt each other's index.
+    """
+
+    def __init__(self, inner: ModelProvider, path: str) -> None:
+        self.inner = inner
+        self.writer = open_writer(path)
+
+    async def generate(self, req: CompletionRequest) -> Completion:
+        out = await self.inner.generate(req)
+        self.writer.append(req, out)
+        return out
+
+    async def batchGenerate(self, reqs: List[CompletionRequest]) -> List[Completion]:  # noqa: N802
+        outs = await self.inner.batchGenerate(reqs)
+        for req, out in zip(reqs, outs):
+            self.writer.append(req, out)
+        return outs
+
+    async def aclose(self) -> None:
+        # The shared writer flushes on every append and outlives this provider
+        await self.inner.aclose()
+
+
+def expand_cassette_paths(spec: Union[str, Sequence[str]]) -> List[str]:
+    """Cassette data files named by paths/globs (`os.pathsep`-separated if a string)."""
+    patterns = spec.split(os.pathsep) if isinstance(spec, str) else list(spec)
+    paths: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(p for p in matches if not p.endswith((".idx", ".sidx", ".tmp")))
+    return list(dict.fromkeys(paths))
+
+
+class ReplayProvider(ModelProvider):
+    """Serve completions from one or more cassettes with no network I/O.
+
+    Accepts several paths or globs (e.g. the per-process cassettes of a sweep
+    recorded with `{pid}`); their indexes are searched in path order. The n-th
+    identical request gets the n-th recorded response (the last one repeats),
+    so sweeps with repeated prompts replay exactly. Unrecorded requests raise
+    `CassetteMiss`.
+    """
+
+    def __init__(self, paths: Union[str, Sequence[str]]) -> None:
+        resolved = expand_cassette_paths(paths)
+        if not resolved:
+            raise FileNotFoundError(f"no cassettes match {paths!r}")
+        self.cassettes = [Cassette(p) for p in resolved]
+        self._served: Dict[bytes, int] = defaultdict(int)
+
+    def _lookup(self, digest: bytes) -> List[Tuple[Cassette, int, int]]:
+        return [(c, off, length) for c in self.cassettes for off, length in c.lookup(digest)]
+
+    async def generate(self, req: CompletionRequest) -> Completion:
+        digest = request_digest(req)
+        entries = self._lookup(digest)
+        if not entries:
+            raise CassetteMiss(f"no recorded exchange for model={req.model!r} prompt={req.prompt[:60]!r}")
+        n = self._served[digest]
+        self._served[digest] = n + 1
+        cassette, offset, length = entries[min(n, len(entries) - 1)]
+        entry = cassette.read(offset, length)
+        return Completion(
+            model=req.model,
+            prompt=req.prompt,
+            text=entry["text"],
+            usage=entry.get("usage", {}),
+            finish_reason=entry.get("finish_reason"),
+        )
+
+    async def batchGenerate(self, reqs: List[CompletionRequest]) -> List[Completion]:  # noqa: N802
+        return [await self.generate(r) for r in reqs]
+
+
+_REPLAYERS: Dict[Tuple[str, ...], ReplayProvider] = {}
+_REPLAYERS_LOCK = threading.Lock()
+
+
+def open_replay(spec: Union[str, Sequence[str]]) -> ReplayProvider:
+    """Process-wide replayer for `spec`; repeated calls share cassettes and served counts."""
+    key = tuple(os.path.abspath(p) for p in expand_cassette_paths(spec))
+    with _REPLAYERS_LOCK:
+        replay = _REPLAYERS.get(key)
+        if replay is None:
+            replay = _REPLAYERS[key] = ReplayProvider(list(key) or spec)
+        return replay
+
+
+def make_provider() -> ModelProvider:
+    """Provider for services: replay from `PROVIDER_REPLAY_PATH` if set, else Novita.
+
+    `PROVIDER_REPLAY_PATH` takes one or more paths/globs separated by `os.pathsep`;
+    the replayer is shared per process, so services that build a provider per
+    request still advance through repeated recordings in order.
+
+    `PROVIDER_RECORD_PATH` (may contain `{pid}`) records every exchange.
+    """
+    replay_path = os.getenv("PROVIDER_REPLAY_PATH")
+    provider: ModelProvider
+    if replay_path:
+        provider = open_replay(replay_path)
+    else:
+        from .novita import NovitaClient
+
+        provider = NovitaClient()
+    record_path = os.getenv("PROVIDER_RECORD_PATH")
+    if record_path:
+        provider = RecordingProvider(provider, record_path.format(pid=os.getpid()))
+    return provider
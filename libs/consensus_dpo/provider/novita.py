@@ -1,25 +1,36 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
-import httpx
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
-from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 
 from .base import Completion, CompletionRequest, GenParams, ModelProvider
-from .cache import SqliteCache
+from .cache import MemoryCache, SqliteCache, compact_chat_response, hash_key, request_params
 from .rate_limiter import TokenBucketLimiter
 
 
+def _env(name: str, default: str) -> Any:
+    # Read at instantiation, not when the class body is evaluated on import
+    return Field(default_factory=lambda: os.getenv(name, default))
+
+
 class NovitaConfig(BaseSettings):
-    api_key: str = os.getenv("NOVITA_API_KEY", "")
-    base_url: str = os.getenv("NOVITA_BASE_URL", "https://api.novita.ai")
-    api_path: str = os.getenv("NOVITA_API_PATH", "/v1/chat/completions")
-    requests_per_second: float = float(os.getenv("NOVITA_REQUESTS_PER_SECOND", 5))
-    cache_db_path: str = os.getenv("RUNS_DIR", "./data/runs") + "/novita_cache.sqlite"
+    api_key: str = _env("NOVITA_API_KEY", "")
+    base_url: str = _env("NOVITA_BASE_URL", "https://api.novita.ai")
+    api_path: str = _env("NOVITA_API_PATH", "/v1/chat/completions")
+    requests_per_second: float = _env("NOVITA_REQUESTS_PER_SECOND", "5")
+    cache_db_path: str = Field(
+        default_factory=lambda: os.getenv("RUNS_DIR", "./data/runs") + "/novita_cache.sqlite"
+    )
+    # Optional shared tier; when set, the local cache sits in front of Redis
+    cache_redis_url: str = _env("NOVITA_CACHE_REDIS_URL", "")
+    cache_local: str = _env("NOVITA_CACHE_LOCAL", "sqlite")  # sqlite | memory
+    cache_compress_level: int = _env("NOVITA_CACHE_COMPRESS_LEVEL", "1")  # 0 = plain orjson
+    # Keep the full provider JSON on `Completion.raw` (debugging only; costs RSS)
+    keep_raw: bool = Field(default_factory=lambda: os.getenv("NOVITA_KEEP_RAW", "0") == "1")
 
 
 class _ChatMessage(BaseModel):
@@ -35,12 +46,29 @@ class NovitaClient(ModelProvider):
     """
 
     def __init__(self, config: Optional[NovitaConfig] = None) -> None:
+        import httpx
+
         self.config = config or NovitaConfig()
         self._client = httpx.AsyncClient(timeout=60)
         self._limiter = TokenBucketLimiter(self.config.requests_per_second)
-        self._cache = SqliteCache(self.config.cache_db_path)
+        self._cache = self._build_cache()
+
+    def _build_cache(self):
+        if self.config.cache_local == "memory":
+            local = MemoryCache()
+        else:
+            local = SqliteCache(self.config.cache_db_path, self.config.cache_compress_level)
+        if not self.config.cache_redis_url:
+            return local
+        from .redis_cache import RedisCache, TieredCache
+
+        shared = RedisCache(self.config.cache_redis_url, compress_level=self.config.cache_compress_level)
+        return TieredCache(local, shared)
 
     async def _post_chat_completions(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        import httpx
+        from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
         url = self.config.base_url.rstrip("/") + self.config.api_path
         headers = {"Authorization": f"Bearer {self.config.api_key}"}
 
@@ -73,36 +101,71 @@ class NovitaClient(ModelProvider):
         return payload
 
     def _cache_key_params(self, req: CompletionRequest) -> Dict[str, Any]:
-        return {
-            "model": req.model,
-            "temperature": req.params.temperature,
-            "top_p": req.params.top_p,
-            "max_tokens": req.params.max_tokens,
-            "seed": req.params.seed,
-            "stop": req.params.stop or [],
-        }
+        return request_params(req)
+
+    @staticmethod
+    def _from_cached(req: CompletionRequest, cached: Dict[str, Any]) -> Completion:
+        # Entries written before compact payloads hold the full raw response
+        entry = compact_chat_response(cached)
+        return Completion(
+            model=req.model,
+            prompt=req.prompt,
+            text=entry["text"],
+            usage=entry.get("usage", {}),
+            finish_reason=entry.get("finish_reason"),
+        )
 
     async def generate(self, req: CompletionRequest) -> Completion:
         cache_params = self._cache_key_params(req)
-        cached = self._cache.get(req.prompt, cache_params)
+        cached = await self._cache_call(self._cache.get, req.prompt, cache_params)
         if cached:
-            choice = cached["choices"][0]["message"]["content"]
-            usage = cached.get("usage", {})
-            return Completion(model=req.model, prompt=req.prompt, text=choice, usage=usage, raw=cached)
+            return self._from_cached(req, cached)
+        return await self._generate_uncached(req, cache_params)
 
+    async def _generate_uncached(self, req: CompletionRequest, cache_params: Dict[str, Any]) -> Completion:
         payload = self._to_payload(req)
         raw = await self._post_chat_completions(payload)
-        # Basic OpenAI-compatible shape
-        text = raw.get("choices", [{}])[0].get("message", {}).get("content", "")
-        usage = raw.get("usage", {})
+        # Basic OpenAI-compatible shape; only text/usage/finish_reason are cached
+        entry = compact_chat_response(raw)
         # Cache short-lived to reduce retries during sweeps
-        self._cache.set(req.prompt, cache_params, raw, ttl_seconds=600)
-        return Completion(model=req.model, prompt=req.prompt, text=text, usage=usage, raw=raw)
+        await self._cache_call(self._cache.set, req.prompt, cache_params, entry, ttl_seconds=600)
+        return Completion(
+            model=req.model,
+            prompt=req.prompt,
+            text=entry["text"],
+            usage=entry["usage"],
+            finish_reason=entry["finish_reason"],
+            raw=raw if self.config.keep_raw else None,
+        )
 
     async def batchGenerate(self, reqs: List[CompletionRequest]) -> List[Completion]:  # noqa: N802
-        return [await self.generate(r) for r in reqs]
+        # One round-trip to the cache tiers for the whole batch; duplicates within
+        # the batch reuse the first result instead of querying the tiers again
+        cache_params = [self._cache_key_params(r) for r in reqs]
+        cached = await self._cache_call(
+            self._cache.get_many, [(r.prompt, p) for r, p in zip(reqs, cache_params)]
+        )
+        fresh: Dict[str, Completion] = {}
+        outs: List[Completion] = []
+        for r, p, hit in zip(reqs, cache_params, cached):
+            if hit:
+                outs.append(self._from_cached(r, hit))
+                continue
+            key = hash_key(r.prompt, p)
+            if key not in fresh:
+                fresh[key] = await self._generate_uncached(r, p)
+            done = fresh[key]
+            outs.append(Completion(r.model, r.prompt, done.text, done.usage, done.finish_reason))
+        return outs
+
+    async def _cache_call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        # The shared tier is a network round trip on a sync client; keep it off the loop
+        if self.config.cache_redis_url:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
 
     async def aclose(self) -> None:
         await self._client.aclose()
+        self._cache.close()
 
 
@@ -4,8 +4,6 @@ import asyncio
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
 
-from aiolimiter import AsyncLimiter
-
 
 class TokenBucketLimiter:
     """Simple token bucket limiter wrapper.
@@ -17,6 +15,8 @@ class TokenBucketLimiter:
     """
 
     def __init__(self, rate_per_sec: float) -> None:
+        from aiolimiter import AsyncLimiter
+
         self._limiter = AsyncLimiter(max_rate=rate_per_sec, time_period=1)
 
     @asynccontextmanager
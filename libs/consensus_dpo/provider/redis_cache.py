@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import redis
+
+from .cache import CacheItem, MemoryCache, SqliteCache, decode_value, encode_value, hash_key
+
+
+logger = logging.getLogger(__name__)
+
+LocalCache = Union[SqliteCache, MemoryCache]
+
+
+class RedisCache:
+    """Redis-backed completion cache shared across workers and nodes.
+
+    Same interface as `SqliteCache`. Values use the shared `encode_value`
+    binary encoding; TTLs use native Redis expiry and multi-gets are pipelined.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        namespace: str = "cdpo:cache",
+        compress_level: int = 1,
+        socket_timeout_s: float = 1.0,
+        client: Optional[redis.Redis] = None,
+    ) -> None:
+        self.namespace = namespace
+        self.compress_level = compress_level
+        # Callers run this off the event loop (NovitaClient uses asyncio.to_thread);
+        # the timeouts only bound how long a dead Redis can hold a worker thread
+        self._r = client or redis.Redis.from_url(
+            url, socket_connect_timeout=socket_timeout_s, socket_timeout=socket_timeout_s
+        )
+
+    def _key(self, prompt: str, params: Dict[str, Any]) -> str:
+        return f"{self.namespace}:{hash_key(prompt, params)}"
+
+    def _encode(self, value: Dict[str, Any]) -> bytes:
+        return encode_value(value, self.compress_level)
+
+    @staticmethod
+    def _decode(blob: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        return decode_value(blob) if blob is not None else None
+
+    def get(self, prompt: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self._decode(self._r.get(self._key(prompt, params)))
+
+    def get_many(self, items: Sequence[CacheItem]) -> List[Optional[Dict[str, Any]]]:
+        return [value for value, _ in self.get_many_with_ttl(items)]
+
+    def get_many_with_ttl(
+        self, items: Sequence[CacheItem]
+    ) -> List[Tuple[Optional[Dict[str, Any]], Optional[int]]]:
+        """Pipelined GET + TTL for each item; TTL is None for keys without expiry."""
+        if not items:
+            return []
+        pipe = self._r.pipeline(transaction=False)
+        for prompt, params in items:
+            key = self._key(prompt, params)
+            pipe.get(key)
+            pipe.ttl(key)
+        replies = pipe.execute()
+        out: List[Tuple[Optional[Dict[str, Any]], Optional[int]]] = []
+        for blob, ttl in zip(replies[0::2], replies[1::2]):
+            out.append((self._decode(blob), int(ttl) if ttl and ttl > 0 else None))
+        return out
+
+    def close(self) -> None:
+        self._r.close()
+
+    def set(self, prompt: str, params: Dict[str, Any], value: Dict[str, Any], ttl_seconds: Optional[int] = None) -> None:
+        self._r.set(self._key(prompt, params), self._encode(value), ex=ttl_seconds or None)
+
+
+class TieredCache:
+    """Local cache (SQLite or in-memory) in front of a shared `RedisCache`.
+
+    Reads hit the local tier first and backfill it from Redis with the remaining
+    TTL; writes go to both. Redis errors degrade to local-only caching instead
+    of failing the request, and the shared tier is skipped for `cooldown_s`
+    after an error so a sick Redis does not cost a timeout on every lookup.
+    """
+
+    def __init__(self, local: LocalCache, shared: RedisCache, cooldown_s: float = 30.0) -> None:
+        self.local = local
+        self.shared = shared
+        self.cooldown_s = cooldown_s
+        self._skip_shared_until = 0.0
+
+    def _shared_available(self) -> bool:
+        return time.monotonic() >= self._skip_shared_until
+
+    def _trip(self, exc: Exception, action: str) -> None:
+        self._skip_shared_until = time.monotonic() + self.cooldown_s
+        logger.warning("shared cache %s failed, local tier only for %.0fs: %s", action, self.cooldown_s, exc)
+
+    def get(self, prompt: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self.get_many([(prompt, params)])[0]
+
+    def get_many(self, items: Sequence[CacheItem]) -> List[Optional[Dict[str, Any]]]:
+        results = self.local.get_many(items)
+        missing = [i for i, v in enumerate(results) if v is None]
+        if not missing or not self._shared_available():
+            return results
+        try:
+            remote = self.shared.get_many_with_ttl([items[i] for i in missing])
+        except redis.RedisError as exc:
+            self._trip(exc, "read")
+            return results
+        for i, (value, ttl) in zip(missing, remote):
+            if value is None:
+                continue
+            prompt, params = items[i]
+            self.local.set(prompt, params, value, ttl_seconds=ttl)
+            results[i] = value
+        return results
+
+    def set(self, prompt: str, params: Dict[str, Any], value: Dict[str, Any], ttl_seconds: Optional[int] = None) -> None:
+        self.local.set(prompt, params, value, ttl_seconds=ttl_seconds)
+        if not self._shared_available():
+            return
+        try:
+            self.shared.set(prompt, params, value, ttl_seconds=ttl_seconds)
+        except redis.RedisError as exc:
+            self._trip(exc, "write")
+
+    def close(self) -> None:
+        self.local.close()
+        self.shared.close()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import List
+
+import pytest
+
+from libs.consensus_dpo.provider.base import Completion, CompletionRequest, GenParams, ModelProvider
+from libs.consensus_dpo.provider import cassette
+from libs.consensus_dpo.provider.cassette import (
+    Cassette,
+    CassetteMiss,
+    CassetteWriter,
+    RecordingProvider,
+    ReplayProvider,
+    make_provider,
+)
+
+
+class _CountingProvider(ModelProvider):
+    def __init__(self, prefix: str = "text") -> None:
+        self.prefix = prefix
+        self.calls = 0
+
+    async def generate(self, req: CompletionRequest) -> Completion:
+        text = f"{self.prefix}{self.calls}"
+        self.calls += 1
+        return Completion(model=req.model, prompt=req.prompt, text=text, usage={}, finish_reason="stop")
+
+    async def batchGenerate(self, reqs: List[CompletionRequest]) -> List[Completion]:  # noqa: N802
+        return [await self.generate(r) for r in reqs]
+
+
+def _req(prompt: str) -> CompletionRequest:
+    return CompletionRequest(model="m", prompt=prompt, params=GenParams())
+
+
+def test_interleaved_writers_on_one_path_replay_correctly(tmp_path):
+    path = str(tmp_path / "sweep.cassette")
+    w1, w2 = CassetteWriter(path), CassetteWriter(path)
+    w1.append(_req("p0"), Completion("m", "p0", "text0", {}, "stop"))
+    w2.append(_req("p1"), Completion("m", "p1", "text1", {}, "stop"))
+    w1.append(_req("p2"), Completion("m", "p2", "text2", {}, "stop"))
+    w1.close()
+    w2.close()
+
+    replay = ReplayProvider(path)
+    texts = [asyncio.run(replay.generate(_req(f"p{i}"))).text for i in range(3)]
+    assert texts == ["text0", "text1", "text2"]
+
+
+def test_per_request_recorders_share_one_writer(tmp_path):
+    path = str(tmp_path / "sweep.cassette")
+    inner = _CountingProvider()
+
+    async def record() -> None:
+        recorders = [RecordingProvider(inner, path) for _ in range(3)]
+        assert len({id(r.writer) for r in recorders}) == 1
+        await asyncio.gather(*(r.generate(_req(f"p{i}")) for i, r in enumerate(recorders)))
+        for r in recorders:
+            await r.aclose()
+
+    asyncio.run(record())
+    replay = ReplayProvider(path)
+    outs = {asyncio.run(replay.generate(_req(f"p{i}"))).text for i in range(3)}
+    assert outs == {"text0", "text1", "text2"}
+
+
+def test_repeated_requests_replay_in_recording_order(tmp_path):
+    path = str(tmp_path / "sweep.cassette")
+    writer = CassetteWriter(path)
+    for text in ("a", "b"):
+        writer.append(_req("same"), Completion("m", "same", text, {}, "stop"))
+    writer.close()
+
+    replay = ReplayProvider(path)
+    texts = [asyncio.run(replay.generate(_req("same"))).text for _ in range(3)]
+    assert texts == ["a", "b", "b"]
+    with pytest.raises(CassetteMiss):
+        asyncio.run(replay.generate(_req("never recorded")))
+
+
+def test_replay_merges_per_process_cassettes_from_glob(tmp_path):
+    for pid, prompt in ((101, "p0"), (202, "p1")):
+        writer = CassetteWriter(str(tmp_path / f"sweep-{pid}.cassette"))
+        writer.append(_req(prompt), Completion("m", prompt, f"from-{pid}", {}, "stop"))
+        writer.close()
+
+    replay = ReplayProvider(os.path.join(str(tmp_path), "sweep-*.cassette"))
+    assert len(replay.cassettes) == 2
+    assert asyncio.run(replay.generate(_req("p0"))).text == "from-101"
+    assert asyncio.run(replay.generate(_req("p1"))).text == "from-202"
+
+
+def test_sorted_index_save_failure_keeps_in_memory_index(tmp_path, monkeypatch):
+    path = str(tmp_path / "sweep.cassette")
+    writer = CassetteWriter(path)
+    writer.append(_req("p0"), Completion("m", "p0", "text0", {}, "stop"))
+    writer.close()
+
+    def read_only(*args, **kwargs):
+        raise PermissionError("read-only directory")
+
+    monkeypatch.setattr(cassette.tempfile, "mkstemp", read_only)
+    tape = Cassette(path)
+    assert len(tape.lookup(cassette.request_digest(_req("p0")))) == 1
+    assert sorted(os.listdir(tmp_path)) == ["sweep.cassette", "sweep.cassette.idx"]
+
+
+def test_make_provider_shares_replay_state_across_calls(tmp_path, monkeypatch):
+    path = str(tmp_path / "sweep.cassette")
+    writer = CassetteWriter(path)
+    for text in ("a", "b"):
+        writer.append(_req("same"), Completion("m", "same", text, {}, "stop"))
+    writer.close()
+
+    monkeypatch.setenv("PROVIDER_REPLAY_PATH", path)
+    monkeypatch.delenv("PROVIDER_RECORD_PATH", raising=False)
+    first, second = make_provider(), make_provider()
+    assert first is second
+    assert asyncio.run(first.generate(_req("same"))).text == "a"
+    assert asyncio.run(second.generate(_req("same"))).text == "b"